@@ -0,0 +1,90 @@
+import asyncio
+import math
+from contextlib import asynccontextmanager
+from typing import Dict
+
+from .config import settings
+
+
+class Saturated(Exception):
+    """Raised when a bulkhead has no free slot and its queue is full or timed out."""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"{name} is saturated")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class Bulkhead:
+    """Concurrency limit with a bounded wait queue for one endpoint."""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._active = 0
+        self._waiting = 0
+        self._stats = {"admitted": 0, "queued": 0, "rejected": 0, "queue_timeouts": 0}
+
+    def _saturated(self) -> Saturated:
+        return Saturated(self.name, max(1, math.ceil(self.queue_timeout)))
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore.locked():
+            if self._waiting >= self.max_queue:
+                self._stats["rejected"] += 1
+                raise self._saturated()
+            self._waiting += 1
+            self._stats["queued"] += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self._stats["queue_timeouts"] += 1
+                raise self._saturated()
+            finally:
+                self._waiting -= 1
+        else:
+            await self._semaphore.acquire()
+
+        self._active += 1
+        self._stats["admitted"] += 1
+        try:
+            yield
+        finally:
+            self._active -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._stats, "active": self._active, "waiting": self._waiting}
+
+
+class AdmissionControl:
+    """Per-endpoint bulkheads sharing the ANALYTICS_* limits, plus timeout counters."""
+
+    def __init__(self):
+        self._bulkheads: Dict[str, Bulkhead] = {}
+        self.statement_timeouts = 0
+        self.read_timeouts = 0
+
+    def bulkhead(self, name: str) -> Bulkhead:
+        bulkhead = self._bulkheads.get(name)
+        if bulkhead is None:
+            bulkhead = self._bulkheads[name] = Bulkhead(
+                name,
+                max_concurrent=settings.ANALYTICS_MAX_CONCURRENCY,
+                max_queue=settings.ANALYTICS_MAX_QUEUE,
+                queue_timeout=settings.ANALYTICS_QUEUE_TIMEOUT_SECONDS,
+            )
+        return bulkhead
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "statement_timeouts": self.statement_timeouts,
+            "read_timeouts": self.read_timeouts,
+            "endpoints": {name: bulkhead.stats() for name, bulkhead in self._bulkheads.items()},
+        }
+
+
+admission = AdmissionControl()
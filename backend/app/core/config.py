@@ -40,6 +40,16 @@ class Settings:
         os.getenv("CORS_ORIGINS", "http://localhost:3000,http://127.0.0.1:3000")
     )
 
+    SINGLEFLIGHT_TIMEOUT_SECONDS = float(os.getenv("SINGLEFLIGHT_TIMEOUT_SECONDS", 30))
+    ANALYTICS_MAX_CONCURRENCY = int(os.getenv("ANALYTICS_MAX_CONCURRENCY", 4))
+    ANALYTICS_MAX_QUEUE = int(os.getenv("ANALYTICS_MAX_QUEUE", 16))
+    ANALYTICS_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ANALYTICS_QUEUE_TIMEOUT_SECONDS", 5))
+    ANALYTICS_STATEMENT_TIMEOUT_MS = int(os.getenv("ANALYTICS_STATEMENT_TIMEOUT_MS", 15000))
+    DISTRIBUTION_REFRESH_SECONDS = float(os.getenv("DISTRIBUTION_REFRESH_SECONDS", 300))
+    DISTRIBUTION_RESCAN_MONTHS = int(os.getenv("DISTRIBUTION_RESCAN_MONTHS", 2))
+    EXPORT_DIR = os.getenv("EXPORT_DIR", "exports")
+    TYPE_DIMENSION_CHECK_SECONDS = float(os.getenv("TYPE_DIMENSION_CHECK_SECONDS", 300))
+
     PROJECT_NAME = "OpenClaw Expenses API"
     PROJECT_VERSION = "2.1.0"
 
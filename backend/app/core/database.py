@@ -1,14 +1,63 @@
+from typing import Optional
 
 import pymysql
+from pymysql.constants import CR, ER
 from .config import settings
 
-def get_db_connection():
-    return pymysql.connect(
+# Statement aborted by the server's time limit (MySQL max_execution_time,
+# MariaDB max_statement_time).
+_STATEMENT_TIMEOUT_ERRORS = {ER.QUERY_TIMEOUT, ER.STATEMENT_TIMEOUT}
+
+
+class QueryTimeout(Exception):
+    pass
+
+
+def get_db_connection(**options):
+    params = dict(
         host=settings.DB_HOST,
         port=settings.DB_PORT,
         user=settings.DB_USER,
         password=settings.DB_PASSWORD,
         database=settings.DB_NAME,
         charset='utf8mb4',
-        cursorclass=pymysql.cursors.DictCursor
+        cursorclass=pymysql.cursors.DictCursor,
     )
+    params.update(options)
+    return pymysql.connect(**params)
+
+
+def get_analytics_connection():
+    """Connection for aggregate queries, bounded by ANALYTICS_STATEMENT_TIMEOUT_MS.
+
+    The server-side limit makes the server abort the SELECT itself; the read
+    timeout drops the socket if the server never answers, so a worker thread is
+    never stuck on an analytics query.
+    """
+    timeout_ms = settings.ANALYTICS_STATEMENT_TIMEOUT_MS
+    conn = get_db_connection(read_timeout=timeout_ms / 1000 + 5)
+    try:
+        with conn.cursor() as cursor:
+            if "MariaDB" in conn.get_server_info():
+                cursor.execute("SET SESSION max_statement_time = %s", (timeout_ms / 1000,))
+            else:
+                cursor.execute("SET SESSION max_execution_time = %s", (timeout_ms,))
+    except BaseException:
+        conn.close()
+        raise
+    return conn
+
+
+def query_timeout_kind(exc: Exception) -> Optional[str]:
+    """Return "statement" or "read" when ``exc`` means the query overran its budget.
+
+    A lost connection only counts when pymysql's own read timeout caused it;
+    other disconnects are real outages and are not reported as timeouts.
+    """
+    if not isinstance(exc, pymysql.err.OperationalError) or not exc.args:
+        return None
+    if exc.args[0] in _STATEMENT_TIMEOUT_ERRORS:
+        return "statement"
+    if exc.args[0] == CR.CR_SERVER_LOST and "timed out" in str(exc.args[-1]):
+        return "read"
+    return None
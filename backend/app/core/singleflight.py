@@ -0,0 +1,46 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class SingleFlight:
+    """Coalesce identical concurrent calls into one shared execution.
+
+    The first caller for a key awaits ``func(*args)``; callers arriving while it
+    is still in flight await the same result. Errors are propagated to every
+    waiter. Nothing is cached once the call finishes.
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.timeout = timeout
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._stats = {"executed": 0, "coalesced": 0, "errors": 0, "timeouts": 0}
+
+    async def run(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._execute(key, func, *args))
+            # Mark the exception retrieved even if every waiter timed out.
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self._inflight[key] = future
+            self._stats["executed"] += 1
+        else:
+            self._stats["coalesced"] += 1
+
+        try:
+            # Shield so a waiter timing out does not cancel the shared call.
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            raise
+
+    async def _execute(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        try:
+            return await func(*args)
+        except Exception:
+            self._stats["errors"] += 1
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._stats, "inflight": len(self._inflight)}
@@ -0,0 +1,77 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..core.config import settings
+from ..core.database import get_analytics_connection
+
+TypeKey = Tuple[Optional[str], Optional[str]]
+
+
+def _normalize_code(value: Any) -> Optional[str]:
+    # Approximates the old JOIN under MySQL rules: ints and strings compare by
+    # their text, _ci collation ignores case and PAD SPACE ignores trailing
+    # blanks. Codes are assumed to be textual, so leading zeros stay significant
+    # ('01' does not match 1).
+    if value is None:
+        return None
+    return str(value).rstrip(" ").casefold()
+
+
+class TypeDimension:
+    """In-memory copy of personal_expenses_type keyed by (trans_code, trans_sub_code).
+
+    The table is tiny and rarely changes, so category queries group by codes on
+    the fact table only and resolve names here with ``lookup``. A CHECKSUM TABLE
+    probe, run at most every ``check_interval`` seconds, decides whether to
+    reload; callers run ``ensure_fresh`` once per query, then look up each row.
+    """
+
+    def __init__(self, check_interval: float):
+        self.check_interval = check_interval
+        self._names: Dict[TypeKey, Tuple[Optional[str], Optional[str]]] = {}
+        self._version: Any = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def ensure_fresh(self) -> None:
+        if self._version is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            if self._version is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return
+            conn = get_analytics_connection()
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("CHECKSUM TABLE personal_expenses_type")
+                    version = (cursor.fetchone() or {}).get("Checksum")
+                    if version is None or version != self._version:
+                        cursor.execute(
+                            """
+                            SELECT trans_code, trans_sub_code, trans_type_name, trans_sub_type_name
+                            FROM personal_expenses_type
+                            """
+                        )
+                        self._names = {
+                            (_normalize_code(row["trans_code"]), _normalize_code(row["trans_sub_code"])): (
+                                row["trans_type_name"],
+                                row["trans_sub_type_name"],
+                            )
+                            for row in cursor.fetchall()
+                        }
+                        # A NULL checksum still counts as loaded; the interval governs the next probe.
+                        self._version = version if version is not None else ""
+            finally:
+                conn.close()
+            self._checked_at = time.monotonic()
+
+    def lookup(self, trans_code: Any, trans_sub_code: Any) -> Optional[Tuple[Optional[str], Optional[str]]]:
+        """Return (type name, sub-type name), or None when the codes have no type row."""
+        return self._names.get((_normalize_code(trans_code), _normalize_code(trans_sub_code)))
+
+    def all_names(self) -> List[str]:
+        """Return every distinct type and sub-type name, sorted."""
+        return sorted({name for pair in self._names.values() for name in pair if name is not None})
+
+
+type_dimension = TypeDimension(check_interval=settings.TYPE_DIMENSION_CHECK_SECONDS)
@@ -0,0 +1,223 @@
+from datetime import date
+from typing import Any, Dict, Optional, Tuple
+
+import pymysql
+
+from ..core.config import settings
+from ..core.database import get_db_connection
+from .sketches import LogHistogram
+
+SKETCH_TABLE = "personal_expenses_distribution"
+STATE_TABLE = "personal_expenses_distribution_state"
+STATE_NAME = "personal_expenses_final"
+REFRESH_BATCH_SIZE = 50000
+
+# MySQL reports a NOWAIT lock conflict as ER_LOCK_NOWAIT; MariaDB as a lock wait timeout.
+_LOCK_BUSY_ERRORS = {3572, 1205}
+
+SketchKey = Tuple[str, int, int, str, str]
+
+_tables_ready = False
+
+
+class RefreshInProgress(Exception):
+    pass
+
+
+def ensure_sketch_tables(cursor) -> None:
+    cursor.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {SKETCH_TABLE} (
+            user_id VARCHAR(50) NOT NULL,
+            trans_year SMALLINT NOT NULL,
+            trans_month TINYINT NOT NULL,
+            trans_code VARCHAR(32) NOT NULL,
+            trans_sub_code VARCHAR(32) NOT NULL,
+            sketch BLOB NOT NULL,
+            PRIMARY KEY (user_id, trans_year, trans_month, trans_code, trans_sub_code),
+            KEY idx_period (trans_year, trans_month)
+        )
+        """
+    )
+    cursor.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+            name VARCHAR(64) PRIMARY KEY,
+            last_expense_id BIGINT NOT NULL DEFAULT 0
+        )
+        """
+    )
+    cursor.execute(
+        f"INSERT IGNORE INTO {STATE_TABLE} (name, last_expense_id) VALUES (%s, 0)",
+        (STATE_NAME,),
+    )
+
+
+def _window_start(months: int) -> date:
+    today = date.today()
+    index = today.year * 12 + today.month - 1 - max(months - 1, 0)
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _code(value: Any) -> str:
+    # Sketch key columns are NOT NULL; a NULL code is stored as "" (never "None")
+    # and, having no type row, reads back as 未分类.
+    return "" if value is None else str(value)
+
+
+def _sketch_key(row: Dict[str, Any]) -> Optional[SketchKey]:
+    """Return the row's sketch key, or None when its period is NULL or not numeric."""
+    try:
+        year, month = int(row["trans_year"]), int(row["trans_month"])
+    except (TypeError, ValueError):
+        return None
+    return (str(row["user_id"]), year, month, _code(row["trans_code"]), _code(row["trans_sub_code"]))
+
+
+def _add_row(sketches: Dict[SketchKey, LogHistogram], key: SketchKey, amount: Any) -> None:
+    sketch = sketches.get(key)
+    if sketch is None:
+        sketch = sketches[key] = LogHistogram()
+    sketch.add(amount)
+
+
+def _fold_new_rows(cursor, start_id: int, end_id: int, window_period: int, sketches: Dict) -> int:
+    """Add rows in (start_id, end_id] from months before the rescan window, in id batches."""
+    folded = 0
+    while True:
+        cursor.execute(
+            """
+            SELECT id, user_id, trans_year, trans_month, trans_code, trans_sub_code, trans_amount
+            FROM personal_expenses_final
+            WHERE deleted_at = 0 AND id > %s AND id <= %s
+            ORDER BY id
+            LIMIT %s
+            """,
+            (start_id, end_id, REFRESH_BATCH_SIZE),
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            return folded
+        for row in rows:
+            key = _sketch_key(row)
+            if key is None or row["trans_amount"] is None or key[1] * 100 + key[2] >= window_period:
+                continue
+            _add_row(sketches, key, row["trans_amount"])
+            folded += 1
+        start_id = rows[-1]["id"]
+
+
+def _rescan_window(cursor, end_id: int, window_period: int) -> Dict[SketchKey, LogHistogram]:
+    """Rebuild the sketches of the rescan window from scratch.
+
+    Rows are selected by the same trans_year/trans_month key that the fold pass
+    and the window DELETE use, so every row lands in exactly one of the two. The
+    expression cannot use an index; the scan is the price of that consistency.
+    """
+    cursor.execute(
+        """
+        SELECT user_id, trans_year, trans_month, trans_code, trans_sub_code, trans_amount
+        FROM personal_expenses_final
+        WHERE deleted_at = 0 AND id <= %s AND trans_year * 100 + trans_month >= %s
+        """,
+        (end_id, window_period),
+    )
+    sketches: Dict[SketchKey, LogHistogram] = {}
+    for row in cursor.fetchall():
+        key = _sketch_key(row)
+        if key is not None and row["trans_amount"] is not None and key[1] * 100 + key[2] >= window_period:
+            _add_row(sketches, key, row["trans_amount"])
+    return sketches
+
+
+def _write_sketch(cursor, key: SketchKey, sketch: LogHistogram) -> None:
+    cursor.execute(
+        f"""
+        REPLACE INTO {SKETCH_TABLE}
+            (user_id, trans_year, trans_month, trans_code, trans_sub_code, sketch)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        """,
+        (*key, sketch.to_bytes()),
+    )
+
+
+def _refresh(conn, rebuild: bool) -> int:
+    with conn.cursor() as cursor:
+        try:
+            cursor.execute(
+                f"SELECT last_expense_id FROM {STATE_TABLE} WHERE name = %s FOR UPDATE NOWAIT",
+                (STATE_NAME,),
+            )
+        except pymysql.err.OperationalError as exc:
+            if exc.args and exc.args[0] in _LOCK_BUSY_ERRORS:
+                conn.rollback()
+                raise RefreshInProgress("Another distribution refresh is running")
+            raise
+        watermark = 0 if rebuild else cursor.fetchone()["last_expense_id"]
+        cursor.execute("SELECT COALESCE(MAX(id), 0) AS max_id FROM personal_expenses_final")
+        end_id = cursor.fetchone()["max_id"]
+
+        window_start = _window_start(settings.DISTRIBUTION_RESCAN_MONTHS)
+        window_period = window_start.year * 100 + window_start.month
+        deltas: Dict[SketchKey, LogHistogram] = {}
+        folded = _fold_new_rows(cursor, watermark, end_id, window_period, deltas)
+        window = _rescan_window(cursor, end_id, window_period)
+
+        if rebuild:
+            cursor.execute(f"DELETE FROM {SKETCH_TABLE}")
+        else:
+            for key, delta in deltas.items():
+                cursor.execute(
+                    f"""
+                    SELECT sketch FROM {SKETCH_TABLE}
+                    WHERE user_id = %s AND trans_year = %s AND trans_month = %s
+                        AND trans_code = %s AND trans_sub_code = %s
+                    """,
+                    key,
+                )
+                existing = cursor.fetchone()
+                if existing:
+                    merged = LogHistogram.from_bytes(existing["sketch"])
+                    merged.merge(delta)
+                    deltas[key] = merged
+            cursor.execute(
+                f"DELETE FROM {SKETCH_TABLE} WHERE trans_year * 100 + trans_month >= %s",
+                (window_period,),
+            )
+        for sketches in (deltas, window):
+            for key, sketch in sketches.items():
+                _write_sketch(cursor, key, sketch)
+
+        cursor.execute(
+            f"UPDATE {STATE_TABLE} SET last_expense_id = %s WHERE name = %s",
+            (end_id, STATE_NAME),
+        )
+    conn.commit()
+    return folded + sum(sketch.count for sketch in window.values())
+
+
+def refresh_sketches(rebuild: bool = False) -> int:
+    """Bring the stored sketches up to date; returns the number of rows sketched.
+
+    Runs off the request path (background task or build_distribution_sketches.py)
+    as one transaction:
+
+    - rows with an id above the watermark are folded into their month's sketch;
+    - the last DISTRIBUTION_RESCAN_MONTHS months are rebuilt from scratch, which
+      picks up soft deletes, edits and ids committed out of order there.
+
+    Deletes or edits in older months, and out-of-order ids that land there, stay
+    stale until a rebuild (``rebuild=True`` / ``--rebuild``). If another refresh
+    holds the watermark lock this raises RefreshInProgress instead of waiting.
+    """
+    global _tables_ready
+    conn = get_db_connection()
+    try:
+        if not _tables_ready:
+            with conn.cursor() as cursor:
+                ensure_sketch_tables(cursor)
+            conn.commit()
+            _tables_ready = True
+        return _refresh(conn, rebuild)
+    finally:
+        conn.close()
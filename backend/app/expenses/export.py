@@ -0,0 +1,309 @@
+import fcntl
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pymysql
+from pymysql.constants import FIELD_TYPE
+
+from ..core.database import get_db_connection
+from .dimensions import type_dimension
+
+EXPORT_COLUMNS = (
+    "id",
+    "user_id",
+    "trans_year",
+    "trans_month",
+    "trans_date",
+    "trans_datetime",
+    "trans_code",
+    "trans_sub_code",
+    "trans_amount",
+    "pay_account",
+)
+# Encoded in the user_id=<id> folder name only: hive readers add partition keys as
+# columns, so storing it in the files too makes them fail to merge the schema.
+PARTITION_COLUMN = "user_id"
+CHUNK_SIZE = 100000
+MANIFEST_NAME = "_manifest.json"
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+class ExportInProgress(Exception):
+    pass
+
+
+def _arrow_type(type_code: int, length: Optional[int], scale: Optional[int]):
+    if type_code in (FIELD_TYPE.TINY, FIELD_TYPE.SHORT, FIELD_TYPE.INT24, FIELD_TYPE.LONG, FIELD_TYPE.YEAR):
+        return pa.int32()
+    if type_code == FIELD_TYPE.LONGLONG:
+        return pa.int64()
+    if type_code in (FIELD_TYPE.DECIMAL, FIELD_TYPE.NEWDECIMAL):
+        # Column length counts sign and point, so it is a safe upper bound on precision.
+        return pa.decimal128(min(max(length or 38, 1), 38), scale or 0)
+    if type_code == FIELD_TYPE.FLOAT:
+        return pa.float32()
+    if type_code == FIELD_TYPE.DOUBLE:
+        return pa.float64()
+    if type_code in (FIELD_TYPE.DATE, FIELD_TYPE.NEWDATE):
+        return pa.date32()
+    if type_code in (FIELD_TYPE.DATETIME, FIELD_TYPE.TIMESTAMP):
+        return pa.timestamp("us")
+    return pa.string()
+
+
+def _read_manifest(output_dir: str) -> Dict[str, Any]:
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"format": None, "last_expense_id": 0, "running": None, "last_error": None, "snapshots": []}
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def _write_manifest(output_dir: str, manifest: Dict[str, Any]) -> None:
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as handle:
+        json.dump(manifest, handle, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+class _PartitionWriters:
+    """One open Parquet/Arrow IPC writer per (user, year) partition for a snapshot."""
+
+    def __init__(self, output_dir: str, file_format: str, schema, snapshot_id: str):
+        self.output_dir = output_dir
+        self.file_format = file_format
+        self.schema = schema
+        self.snapshot_id = snapshot_id
+        self.paths: List[str] = []
+        self._writers: Dict[Tuple[str, str], Any] = {}
+
+    def _open(self, user_id: str, year: str):
+        directory = os.path.join(self.output_dir, f"user_id={quote(user_id, safe='')}", f"year={year}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"part-{self.snapshot_id}{FORMATS[self.file_format]}")
+        self.paths.append(path)
+        if self.file_format == "parquet":
+            return pq.ParquetWriter(path, self.schema, compression="zstd")
+        return pa.ipc.new_file(path, self.schema)
+
+    def write(self, user_id: str, year: str, table) -> None:
+        key = (user_id, year)
+        writer = self._writers.get(key)
+        if writer is None:
+            writer = self._writers[key] = self._open(user_id, year)
+        writer.write_table(table)
+
+    def close(self) -> None:
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+
+    def discard(self) -> None:
+        self.close()
+        for path in self.paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _chunk_table(rows: List[tuple], schema, name_ids: Dict[str, int], names):
+    columns = list(zip(*rows))
+    arrays = [
+        pa.array(values, type=schema.field(name).type)
+        for name, values in zip(EXPORT_COLUMNS, columns)
+        if name != PARTITION_COLUMN
+    ]
+    code_pos = EXPORT_COLUMNS.index("trans_code")
+    sub_code_pos = EXPORT_COLUMNS.index("trans_sub_code")
+    type_ids: List[Optional[int]] = []
+    sub_type_ids: List[Optional[int]] = []
+    for code, sub_code in zip(columns[code_pos], columns[sub_code_pos]):
+        resolved = type_dimension.lookup(code, sub_code)
+        type_ids.append(name_ids.get(resolved[0]) if resolved else None)
+        sub_type_ids.append(name_ids.get(resolved[1]) if resolved else None)
+    for ids in (type_ids, sub_type_ids):
+        arrays.append(pa.DictionaryArray.from_arrays(pa.array(ids, type=pa.int32()), names))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+class ExportJob:
+    """One snapshot export into ``output_dir``; construct, then call ``run``.
+
+    Rows are streamed with a server-side cursor in CHUNK_SIZE batches and written
+    to ``user_id=<id>/year=<year>/part-<snapshot>.<ext>``; user_id lives only in
+    the folder name (hive readers restore it as a column) and type names are added
+    as dictionary-encoded columns. Progress is kept in ``_manifest.json`` under
+    ``running`` (rows so far), then moved to ``snapshots``, or to ``last_error``
+    if the export fails, in which case this snapshot's files are removed.
+
+    Incremental runs (the default) export only rows with an id above the last
+    snapshot's ``last_expense_id``. Rows soft-deleted or edited after they were
+    exported stay as they were in older part files, and rows whose id commits
+    after a higher id was already exported are skipped. ``full=True`` re-exports
+    everything into a sibling directory and swaps it in, which corrects both.
+
+    Construction takes an exclusive lock file next to ``output_dir`` (held across
+    processes until ``run`` finishes) and raises ExportInProgress if it is taken.
+    """
+
+    def __init__(self, output_dir: str, file_format: str = "parquet", full: bool = False):
+        if file_format not in FORMATS:
+            raise ValueError(f"Unsupported export format: {file_format}")
+        self.output_dir = output_dir.rstrip("/") or output_dir
+        self.file_format = file_format
+        self.full = full
+        self.target_dir = f"{self.output_dir}.full-tmp" if full else self.output_dir
+
+        parent = os.path.dirname(os.path.abspath(self.output_dir))
+        os.makedirs(parent, exist_ok=True)
+        self._lock_file = open(f"{self.output_dir}.lock", "w")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock_file.close()
+            raise ExportInProgress("An export is already running")
+        try:
+            if full and os.path.exists(self.target_dir):
+                # Leftover of an interrupted full export; we hold the lock, so it is ours.
+                shutil.rmtree(self.target_dir)
+            os.makedirs(self.target_dir, exist_ok=True)
+            self.manifest = _read_manifest(self.target_dir)
+            if self.manifest["format"] not in (None, file_format):
+                raise ValueError(f"{output_dir} holds {self.manifest['format']} snapshots, not {file_format}")
+            # Sequence prefix keeps file names unique even for exports in the same second.
+            self.snapshot_id = f"{len(self.manifest['snapshots']) + 1:05d}-{datetime.utcnow():%Y%m%dT%H%M%SZ}"
+            self.manifest["running"] = {
+                "snapshot_id": self.snapshot_id,
+                "format": file_format,
+                "rows": 0,
+                "started_at": datetime.utcnow().isoformat() + "Z",
+            }
+            _write_manifest(self.target_dir, self.manifest)
+        except BaseException:
+            self._release()
+            raise
+
+    def _release(self) -> None:
+        fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+        self._lock_file.close()
+
+    def run(self) -> Dict[str, Any]:
+        try:
+            try:
+                result = self._export()
+            except BaseException as exc:
+                self.manifest["running"] = None
+                self.manifest["last_error"] = {"snapshot_id": self.snapshot_id, "error": repr(exc)}
+                _write_manifest(self.target_dir, self.manifest)
+                raise
+            if self.full:
+                self._swap_in()
+            return result
+        finally:
+            self._release()
+
+    def _swap_in(self) -> None:
+        previous = f"{self.output_dir}.previous"
+        if os.path.exists(previous):
+            shutil.rmtree(previous)
+        if os.path.exists(self.output_dir):
+            os.replace(self.output_dir, previous)
+        os.replace(self.target_dir, self.output_dir)
+        if os.path.exists(previous):
+            shutil.rmtree(previous)
+
+    def _export(self) -> Dict[str, Any]:
+        manifest = self.manifest
+        type_dimension.ensure_fresh()
+        name_values = type_dimension.all_names()
+        name_ids = {name: position for position, name in enumerate(name_values)}
+        names = pa.array(name_values, type=pa.string())
+
+        started = time.perf_counter()
+        row_count = 0
+        last_id = manifest["last_expense_id"]
+        writers = None
+        user_pos = EXPORT_COLUMNS.index(PARTITION_COLUMN)
+        year_pos = EXPORT_COLUMNS.index("trans_year")
+
+        conn = get_db_connection(
+            cursorclass=pymysql.cursors.SSCursor,
+            # Writing files between fetches can be slow; keep the stream open.
+            init_command="SET SESSION net_write_timeout = 3600",
+        )
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    f"""
+                    SELECT {", ".join(EXPORT_COLUMNS)}
+                    FROM personal_expenses_final
+                    WHERE deleted_at = 0 AND id > %s
+                    ORDER BY id
+                    """,
+                    (last_id,),
+                )
+                fields = [
+                    pa.field(entry[0], _arrow_type(entry[1], entry[3], entry[5]))
+                    for entry in cursor.description
+                    if entry[0] != PARTITION_COLUMN
+                ]
+                dictionary_type = pa.dictionary(pa.int32(), pa.string())
+                fields.append(pa.field("trans_type_name", dictionary_type))
+                fields.append(pa.field("trans_sub_type_name", dictionary_type))
+                schema = pa.schema(fields)
+                writers = _PartitionWriters(self.target_dir, self.file_format, schema, self.snapshot_id)
+
+                while True:
+                    rows = cursor.fetchmany(CHUNK_SIZE)
+                    if not rows:
+                        break
+                    table = _chunk_table(rows, schema, name_ids, names)
+                    partitions: Dict[Tuple[str, str], List[int]] = {}
+                    for position, row in enumerate(rows):
+                        partitions.setdefault((str(row[user_pos]), str(row[year_pos])), []).append(position)
+                    for (user_id, year), positions in partitions.items():
+                        writers.write(user_id, year, table.take(pa.array(positions)))
+                    row_count += len(rows)
+                    last_id = rows[-1][0]
+                    manifest["running"]["rows"] = row_count
+                    _write_manifest(self.target_dir, manifest)
+            writers.close()
+        except BaseException:
+            if writers is not None:
+                writers.discard()
+            raise
+        finally:
+            conn.close()
+
+        seconds = time.perf_counter() - started
+        result = {
+            "snapshot_id": self.snapshot_id,
+            "format": self.file_format,
+            "rows": row_count,
+            "files": len(writers.paths),
+            "last_expense_id": last_id,
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(row_count / seconds) if seconds > 0 else 0,
+        }
+        manifest["running"] = None
+        if row_count:
+            manifest["format"] = self.file_format
+            manifest["last_expense_id"] = last_id
+            manifest["snapshots"].append(result)
+        _write_manifest(self.target_dir, manifest)
+        return result
+
+
+def export_snapshot(output_dir: str, file_format: str = "parquet", full: bool = False) -> Dict[str, Any]:
+    """Run an ExportJob to completion (CLI entry point)."""
+    return ExportJob(output_dir, file_format, full).run()
+
+
+def read_manifest(output_dir: str) -> Dict[str, Any]:
+    return _read_manifest(output_dir.rstrip("/") or output_dir)
@@ -1,44 +1,123 @@
-from fastapi import APIRouter, Depends
-from typing import List
+import asyncio
+import logging
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
+from typing import List, Literal, Optional
 from ..auth.router import read_users_me
-from .schemas import ExpenseSummary, MonthlyExpense, CategoryExpense, PaymentMethod, TimelineData, StardustData
-from . import service
+from .schemas import ExpenseSummary, MonthlyExpense, CategoryExpense, PaymentMethod, TimelineData, StardustData, DistributionStats, ComparisonData, ExportStarted, ExportManifest
+from ..core.admission import Saturated
+from ..core.config import settings
+from ..core.database import QueryTimeout
+from . import export, service
+
+logger = logging.getLogger(__name__)
+
+# YYYY-MM, with the year kept to 1900-2099 so neighbouring months stay valid dates.
+MONTH_PATTERN = r"^(19|20)\d{2}-(0[1-9]|1[0-2])$"
 
 router = APIRouter(prefix="/expenses", tags=["expenses"])
 
+
+async def _run_query(func, current_user: dict, *params):
+    try:
+        return await service.run_coalesced(func, current_user['id'], current_user['username'], *params)
+    except Saturated as exc:
+        raise HTTPException(
+            status_code=503,
+            detail="Server busy, please retry",
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+    except (asyncio.TimeoutError, QueryTimeout):
+        raise HTTPException(status_code=504, detail="Query timed out")
+
+
 @router.get("/summary", response_model=ExpenseSummary)
 async def get_expenses_summary(current_user: dict = Depends(read_users_me)):
-    user_id = current_user['id']
-    username = current_user['username']
-    return service.get_summary(user_id, username)
+    return await _run_query(service.get_summary, current_user)
 
 @router.get("/monthly", response_model=List[MonthlyExpense])
 async def get_monthly_expenses(current_user: dict = Depends(read_users_me)):
-    user_id = current_user['id']
-    username = current_user['username']
-    return service.get_monthly(user_id, username)
+    return await _run_query(service.get_monthly, current_user)
 
 @router.get("/categories", response_model=List[CategoryExpense])
 async def get_category_expenses(current_user: dict = Depends(read_users_me)):
-    user_id = current_user['id']
-    username = current_user['username']
-    return service.get_categories(user_id, username)
+    return await _run_query(service.get_categories, current_user)
 
 @router.get("/payment-methods", response_model=List[PaymentMethod])
 async def get_payment_method_expenses(current_user: dict = Depends(read_users_me)):
-    user_id = current_user['id']
-    username = current_user['username']
-    return service.get_payment_methods(user_id, username)
+    return await _run_query(service.get_payment_methods, current_user)
 
 @router.get("/timeline", response_model=List[TimelineData])
 async def get_expenses_timeline(current_user: dict = Depends(read_users_me)):
-    user_id = current_user['id']
-    username = current_user['username']
-    return service.get_timeline(user_id, username)
+    return await _run_query(service.get_timeline, current_user)
 
 
 @router.get("/stardust", response_model=StardustData)
 async def get_expenses_stardust(current_user: dict = Depends(read_users_me)):
-    user_id = current_user['id']
-    username = current_user['username']
-    return service.get_stardust(user_id, username)
+    return await _run_query(service.get_stardust, current_user)
+
+
+@router.get("/distribution", response_model=List[DistributionStats])
+async def get_expenses_distribution(
+    start_month: Optional[str] = Query(None, pattern=MONTH_PATTERN),
+    end_month: Optional[str] = Query(None, pattern=MONTH_PATTERN),
+    group_by: Literal["category", "month", "category_month", "all"] = "category",
+    current_user: dict = Depends(read_users_me),
+):
+    """Amount distribution (p50/p90/p99, histogram) merged from stored sketches.
+
+    Sketches are maintained outside the request by the background refresh
+    (every DISTRIBUTION_REFRESH_SECONDS) or build_distribution_sketches.py, so
+    results can lag new expenses by up to one refresh interval. The last
+    DISTRIBUTION_RESCAN_MONTHS months are recomputed on every refresh; deletes
+    and edits in older months only show up after a ``--rebuild``.
+    """
+    return await _run_query(service.get_distribution, current_user, start_month, end_month, group_by)
+
+
+@router.get("/compare", response_model=ComparisonData)
+async def get_expenses_comparison(
+    period: Optional[str] = Query(None, pattern=MONTH_PATTERN),
+    group_by: Literal["category", "pay_account"] = "category",
+    current_user: dict = Depends(read_users_me),
+):
+    return await _run_query(service.get_comparison, current_user, period, group_by)
+
+
+def _run_export_job(job: export.ExportJob) -> None:
+    try:
+        job.run()
+    except Exception:
+        # The failure is recorded under last_error in the snapshot manifest.
+        logger.exception("Snapshot export %s failed", job.snapshot_id)
+
+
+@router.post("/export", response_model=ExportStarted, status_code=202)
+async def export_expenses_snapshot(
+    background_tasks: BackgroundTasks,
+    format: Literal["parquet", "arrow"] = "parquet",
+    current_user: dict = Depends(read_users_me),
+):
+    """Start an incremental export into EXPORT_DIR; poll GET /export for progress.
+
+    Full re-exports (which also drop rows deleted or edited since earlier
+    snapshots) are left to ``export_snapshot.py --full``.
+    """
+    if current_user['username'] != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    try:
+        job = await run_in_threadpool(export.ExportJob, settings.EXPORT_DIR, format)
+    except export.ExportInProgress as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    background_tasks.add_task(_run_export_job, job)
+    return {"snapshot_id": job.snapshot_id, "format": format, "status": "running"}
+
+
+@router.get("/export", response_model=ExportManifest)
+async def get_export_status(current_user: dict = Depends(read_users_me)):
+    if current_user['username'] != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    return await run_in_threadpool(export.read_manifest, settings.EXPORT_DIR)
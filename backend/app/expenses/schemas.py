@@ -34,6 +34,73 @@ class TimelineData(BaseModel):
     daily_total: float
     transaction_count: int
 
+# --- Distribution Models ---
+class HistogramBin(BaseModel):
+    lower: float
+    upper: float
+    count: int
+
+class DistributionStats(BaseModel):
+    group: str
+    category: Optional[str] = None
+    month: Optional[str] = None
+    count: int
+    total_amount: float
+    avg_amount: float
+    min_amount: float
+    max_amount: float
+    p50: float
+    p90: float
+    p99: float
+    histogram: List[HistogramBin]
+
+# --- Comparison Models ---
+class ComparisonEntry(BaseModel):
+    group: str
+    current: float
+    previous: float
+    year_ago: float
+    delta_previous: float
+    delta_previous_pct: Optional[float]
+    delta_year_ago: float
+    delta_year_ago_pct: Optional[float]
+
+class ComparisonData(BaseModel):
+    period: str
+    previous_period: str
+    year_ago_period: str
+    group_by: str
+    total: ComparisonEntry
+    items: List[ComparisonEntry]
+
+# --- Export Models ---
+class ExportResult(BaseModel):
+    snapshot_id: str
+    format: str
+    rows: int
+    files: int
+    last_expense_id: int
+    seconds: float
+    rows_per_second: int
+
+class ExportProgress(BaseModel):
+    snapshot_id: str
+    format: str
+    rows: int
+    started_at: str
+
+class ExportStarted(BaseModel):
+    snapshot_id: str
+    format: str
+    status: str
+
+class ExportManifest(BaseModel):
+    format: Optional[str] = None
+    last_expense_id: int
+    running: Optional[ExportProgress] = None
+    last_error: Optional[Dict[str, str]] = None
+    snapshots: List[ExportResult]
+
 # --- Stardust Models ---
 class StardustNode(BaseModel):
     id: str
@@ -1,7 +1,20 @@
 
-from typing import Any, Dict, List, Tuple
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from ..core.database import get_db_connection
+import pymysql
+from pymysql.constants import ER
+from starlette.concurrency import run_in_threadpool
+
+from ..core.admission import admission
+from ..core.config import settings
+from ..core.database import QueryTimeout, get_analytics_connection, query_timeout_kind
+from ..core.singleflight import SingleFlight
+from .dimensions import type_dimension
+from .distribution import SKETCH_TABLE
+from .sketches import LogHistogram
+
+query_coalescer = SingleFlight(timeout=settings.SINGLEFLIGHT_TIMEOUT_SECONDS)
 
 
 def _build_user_filter(username: str, user_id: str, column: str) -> Tuple[str, Tuple[str, ...]]:
@@ -10,8 +23,34 @@ def _build_user_filter(username: str, user_id: str, column: str) -> Tuple[str, T
     return f" AND {column} = %s", (str(user_id),)
 
 
+def _user_scope(username: str, user_id: str) -> str:
+    # Admin queries are unfiltered, so every admin session shares one scope.
+    return "*" if username == "admin" else str(user_id)
+
+
+async def _execute_query(func: Callable[..., Any], *args: Any) -> Any:
+    async with admission.bulkhead(func.__name__).slot():
+        try:
+            return await run_in_threadpool(func, *args)
+        except pymysql.err.OperationalError as exc:
+            kind = query_timeout_kind(exc)
+            if kind == "statement":
+                admission.statement_timeouts += 1
+            elif kind == "read":
+                admission.read_timeouts += 1
+            else:
+                raise
+            raise QueryTimeout(func.__name__) from exc
+
+
+async def run_coalesced(func: Callable[..., Any], user_id: str, username: str, *params: Any) -> Any:
+    """Run a blocking query function behind single-flight and its endpoint bulkhead."""
+    key = (func.__name__, _user_scope(username, user_id), params)
+    return await query_coalescer.run(key, _execute_query, func, user_id, username, *params)
+
+
 def get_summary(user_id: str, username: str) -> Dict[str, Any]:
-    conn = get_db_connection()
+    conn = get_analytics_connection()
     try:
         with conn.cursor() as cursor:
             user_filter, params = _build_user_filter(username, user_id, "user_id")
@@ -42,7 +81,7 @@ def get_summary(user_id: str, username: str) -> Dict[str, Any]:
 
 
 def get_monthly(user_id: str, username: str) -> List[Dict[str, Any]]:
-    conn = get_db_connection()
+    conn = get_analytics_connection()
     try:
         with conn.cursor() as cursor:
             user_filter, params = _build_user_filter(username, user_id, "user_id")
@@ -65,34 +104,65 @@ def get_monthly(user_id: str, username: str) -> List[Dict[str, Any]]:
         conn.close()
 
 
-def get_categories(user_id: str, username: str) -> List[Dict[str, Any]]:
-    conn = get_db_connection()
+def _aggregate_by_type_name(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Resolve code-level aggregates to type names, matching the old inner JOIN.
+
+    Rows whose codes have no type entry are dropped, and codes sharing the same
+    names are merged.
+    """
+    type_dimension.ensure_fresh()
+    merged: Dict[Tuple[Any, Any], Dict[str, Any]] = {}
+    for row in rows:
+        resolved = type_dimension.lookup(row["trans_code"], row["trans_sub_code"])
+        if resolved is None:
+            continue
+        entry = merged.setdefault(
+            resolved,
+            {
+                "trans_type_name": resolved[0],
+                "trans_sub_type_name": resolved[1],
+                "count": 0,
+                "total_amount": 0,
+            },
+        )
+        entry["count"] += row["count"]
+        entry["total_amount"] += row["total_amount"] or 0
+    return list(merged.values())
+
+
+def _query_type_aggregates(user_id: str, username: str) -> List[Dict[str, Any]]:
+    conn = get_analytics_connection()
     try:
         with conn.cursor() as cursor:
-            user_filter, params = _build_user_filter(username, user_id, "pef.user_id")
+            user_filter, params = _build_user_filter(username, user_id, "user_id")
             sql = f"""
             SELECT
-                pet.trans_type_name,
-                pet.trans_sub_type_name,
-                COUNT(pef.id) AS count,
-                SUM(pef.trans_amount) AS total_amount,
-                AVG(pef.trans_amount) AS avg_amount
-            FROM personal_expenses_final AS pef
-            JOIN personal_expenses_type AS pet
-                ON pef.trans_code = pet.trans_code AND pef.trans_sub_code = pet.trans_sub_code
-            WHERE pef.deleted_at = 0
+                trans_code,
+                trans_sub_code,
+                COUNT(id) AS count,
+                SUM(trans_amount) AS total_amount
+            FROM personal_expenses_final
+            WHERE deleted_at = 0
             {user_filter}
-            GROUP BY pet.trans_type_name, pet.trans_sub_type_name
-            ORDER BY total_amount DESC
+            GROUP BY trans_code, trans_sub_code
             """
             cursor.execute(sql, params)
-            return cursor.fetchall()
+            rows = cursor.fetchall()
     finally:
         conn.close()
+    return _aggregate_by_type_name(rows)
+
+
+def get_categories(user_id: str, username: str) -> List[Dict[str, Any]]:
+    rows = _query_type_aggregates(user_id, username)
+    for row in rows:
+        row["avg_amount"] = row["total_amount"] / row["count"] if row["count"] else 0
+    rows.sort(key=lambda row: row["total_amount"], reverse=True)
+    return rows
 
 
 def get_payment_methods(user_id: str, username: str) -> List[Dict[str, Any]]:
-    conn = get_db_connection()
+    conn = get_analytics_connection()
     try:
         with conn.cursor() as cursor:
             user_filter, params = _build_user_filter(username, user_id, "user_id")
@@ -115,7 +185,7 @@ def get_payment_methods(user_id: str, username: str) -> List[Dict[str, Any]]:
 
 
 def get_timeline(user_id: str, username: str) -> List[Dict[str, Any]]:
-    conn = get_db_connection()
+    conn = get_analytics_connection()
     try:
         with conn.cursor() as cursor:
             user_filter, params = _build_user_filter(username, user_id, "user_id")
@@ -137,26 +207,7 @@ def get_timeline(user_id: str, username: str) -> List[Dict[str, Any]]:
 
 
 def get_stardust(user_id: str, username: str) -> Dict[str, Any]:
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cursor:
-            user_filter, params = _build_user_filter(username, user_id, "pef.user_id")
-            sql = f"""
-            SELECT
-                pet.trans_type_name,
-                pet.trans_sub_type_name,
-                SUM(pef.trans_amount) AS total_amount
-            FROM personal_expenses_final AS pef
-            JOIN personal_expenses_type AS pet
-                ON pef.trans_code = pet.trans_code AND pef.trans_sub_code = pet.trans_sub_code
-            WHERE pef.deleted_at = 0
-            {user_filter}
-            GROUP BY pet.trans_type_name, pet.trans_sub_type_name
-            """
-            cursor.execute(sql, params)
-            rows = cursor.fetchall()
-    finally:
-        conn.close()
+    rows = _query_type_aggregates(user_id, username)
 
     nodes: List[Dict[str, Any]] = []
     links: List[Dict[str, str]] = []
@@ -227,3 +278,194 @@ def get_stardust(user_id: str, username: str) -> Dict[str, Any]:
             node["symbolSize"] = 20 + (float(node["value"]) / safe_total) * 60
 
     return {"nodes": nodes, "links": links, "categories": categories}
+
+
+def _parse_period(value: Optional[str], default: int) -> int:
+    if not value:
+        return default
+    year, month = value.split("-")
+    return int(year) * 100 + int(month)
+
+
+def _distribution_stats(category: Optional[str], month: Optional[str], sketch: LogHistogram) -> Dict[str, Any]:
+    return {
+        "group": " / ".join(part for part in (category, month) if part) or "all",
+        "category": category,
+        "month": month,
+        "count": sketch.count,
+        "total_amount": sketch.total,
+        "avg_amount": sketch.total / sketch.count if sketch.count else 0,
+        "min_amount": sketch.min,
+        "max_amount": sketch.max,
+        "p50": sketch.quantile(0.5),
+        "p90": sketch.quantile(0.9),
+        "p99": sketch.quantile(0.99),
+        "histogram": sketch.bins(),
+    }
+
+
+def get_distribution(
+    user_id: str,
+    username: str,
+    start_month: Optional[str] = None,
+    end_month: Optional[str] = None,
+    group_by: str = "category",
+) -> List[Dict[str, Any]]:
+    """Merge stored sketches; never writes. Freshness depends on refresh_sketches."""
+    conn = get_analytics_connection()
+    try:
+        with conn.cursor() as cursor:
+            user_filter, user_params = _build_user_filter(username, user_id, "user_id")
+            sql = f"""
+            SELECT trans_year, trans_month, trans_code, trans_sub_code, sketch
+            FROM {SKETCH_TABLE}
+            WHERE trans_year * 100 + trans_month BETWEEN %s AND %s
+            {user_filter}
+            """
+            params = (_parse_period(start_month, 0), _parse_period(end_month, 999999)) + user_params
+            try:
+                cursor.execute(sql, params)
+            except pymysql.err.ProgrammingError as exc:
+                # Sketch tables appear with the first refresh; until then there is nothing to merge.
+                if exc.args and exc.args[0] == ER.NO_SUCH_TABLE:
+                    return []
+                raise
+            rows = cursor.fetchall()
+    finally:
+        conn.close()
+
+    by_category = group_by in ("category", "category_month")
+    by_month = group_by in ("month", "category_month")
+    type_dimension.ensure_fresh()
+    groups: Dict[Tuple[Optional[str], Optional[str]], LogHistogram] = {}
+    for row in rows:
+        category = None
+        if by_category:
+            names = type_dimension.lookup(row["trans_code"], row["trans_sub_code"])
+            category = (names[0] if names else None) or "未分类"
+        month = f"{row['trans_year']:04d}-{row['trans_month']:02d}" if by_month else None
+        merged = groups.get((category, month))
+        if merged is None:
+            merged = groups[(category, month)] = LogHistogram()
+        merged.merge(LogHistogram.from_bytes(row["sketch"]))
+
+    result = [_distribution_stats(*group, sketch) for group, sketch in groups.items() if sketch.count]
+    if group_by == "month":
+        result.sort(key=lambda item: item["month"])
+    elif group_by == "category_month":
+        result.sort(key=lambda item: (item["category"], item["month"]))
+    else:
+        result.sort(key=lambda item: item["total_amount"], reverse=True)
+    return result
+
+
+def _month_start(year: int, month: int) -> date:
+    # Normalises month offsets such as 0 or 13 into the neighbouring year.
+    year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+    return date(year, month, 1)
+
+
+def _comparison_bounds(year: int, month: int) -> Tuple[date, date, date, date, date]:
+    """Return current start/end, previous-month start and year-ago start/end."""
+    return (
+        _month_start(year, month),
+        _month_start(year, month + 1),
+        _month_start(year, month - 1),
+        _month_start(year - 1, month),
+        _month_start(year - 1, month + 1),
+    )
+
+
+def _comparison_entry(group: str, current: float, previous: float, year_ago: float) -> Dict[str, Any]:
+    def pct(base: float) -> Optional[float]:
+        return (current - base) / base * 100 if base else None
+
+    return {
+        "group": group,
+        "current": current,
+        "previous": previous,
+        "year_ago": year_ago,
+        "delta_previous": current - previous,
+        "delta_previous_pct": pct(previous),
+        "delta_year_ago": current - year_ago,
+        "delta_year_ago_pct": pct(year_ago),
+    }
+
+
+def get_comparison(
+    user_id: str,
+    username: str,
+    period: Optional[str] = None,
+    group_by: str = "category",
+) -> Dict[str, Any]:
+    today = date.today()
+    year, month = map(int, period.split("-")) if period else (today.year, today.month)
+    current_start, current_end, previous_start, year_ago_start, year_ago_end = _comparison_bounds(year, month)
+
+    group_columns = "trans_code, trans_sub_code" if group_by == "category" else "pay_account"
+    conn = get_analytics_connection()
+    try:
+        with conn.cursor() as cursor:
+            user_filter, user_params = _build_user_filter(username, user_id, "user_id")
+            # Two bounded ranges (previous + current month, and the year-ago month)
+            # scanned once, split into the three totals by conditional aggregation.
+            sql = f"""
+            SELECT
+                {group_columns},
+                SUM(CASE WHEN trans_datetime >= %s THEN trans_amount ELSE 0 END) AS current_total,
+                SUM(CASE WHEN trans_datetime >= %s AND trans_datetime < %s
+                    THEN trans_amount ELSE 0 END) AS previous_total,
+                SUM(CASE WHEN trans_datetime < %s THEN trans_amount ELSE 0 END) AS year_ago_total
+            FROM personal_expenses_final
+            WHERE deleted_at = 0
+            AND (
+                (trans_datetime >= %s AND trans_datetime < %s)
+                OR (trans_datetime >= %s AND trans_datetime < %s)
+            )
+            {user_filter}
+            GROUP BY {group_columns}
+            """
+            params = (
+                current_start,
+                previous_start,
+                current_start,
+                year_ago_end,
+                previous_start,
+                current_end,
+                year_ago_start,
+                year_ago_end,
+            ) + user_params
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+    finally:
+        conn.close()
+
+    if group_by == "category":
+        type_dimension.ensure_fresh()
+
+        def group_of(row: Dict[str, Any]) -> str:
+            names = type_dimension.lookup(row["trans_code"], row["trans_sub_code"])
+            return (names[0] if names else None) or "未分类"
+    else:
+
+        def group_of(row: Dict[str, Any]) -> str:
+            return row["pay_account"] or "未知"
+
+    totals: Dict[str, List[float]] = {}
+    for row in rows:
+        sums = totals.setdefault(group_of(row), [0.0, 0.0, 0.0])
+        sums[0] += float(row["current_total"] or 0)
+        sums[1] += float(row["previous_total"] or 0)
+        sums[2] += float(row["year_ago_total"] or 0)
+
+    items = [_comparison_entry(group, *sums) for group, sums in totals.items()]
+    items.sort(key=lambda item: item["current"], reverse=True)
+    overall = [sum(sums[i] for sums in totals.values()) for i in range(3)]
+    return {
+        "period": current_start.strftime("%Y-%m"),
+        "previous_period": previous_start.strftime("%Y-%m"),
+        "year_ago_period": year_ago_start.strftime("%Y-%m"),
+        "group_by": group_by,
+        "total": _comparison_entry("all", *overall),
+        "items": items,
+    }
@@ -0,0 +1,147 @@
+import math
+import struct
+from typing import Dict, Iterable, List, Optional
+
+# Relative accuracy of quantile estimates: every value lands in a bucket whose
+# bounds are within ±1% of it, so any reported quantile is within 1% of a true
+# sample at that rank.
+RELATIVE_ACCURACY = 0.01
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+
+_HEADER = struct.Struct("<QdddHHQ")
+_ENTRY = struct.Struct("<hI")
+
+
+class LogHistogram:
+    """Mergeable log-bucket histogram of amounts.
+
+    Positive and negative amounts are bucketed by ``ceil(log_gamma(|x|))`` in
+    separate stores; zeros are counted on their own. Count, sum, min and max are
+    tracked exactly. Merging two histograms is bucket-wise addition, so sketches
+    kept per (user, month, category) can be combined for any date range.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.zero_count = 0
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+
+    @staticmethod
+    def _index(magnitude: float) -> int:
+        return math.ceil(math.log(magnitude) / _LOG_GAMMA)
+
+    @staticmethod
+    def _value(index: int) -> float:
+        # Midpoint (in relative terms) of the bucket (gamma^(i-1), gamma^i].
+        return 2 * _GAMMA ** index / (_GAMMA + 1)
+
+    def add(self, value: float, count: int = 1) -> None:
+        value = float(value)
+        self.count += count
+        self.total += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if value > 0:
+            index = self._index(value)
+            self.positive[index] = self.positive.get(index, 0) + count
+        elif value < 0:
+            index = self._index(-value)
+            self.negative[index] = self.negative.get(index, 0) + count
+        else:
+            self.zero_count += count
+
+    def merge(self, other: "LogHistogram") -> None:
+        if other.count == 0:
+            return
+        self.count += other.count
+        self.total += other.total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self.zero_count += other.zero_count
+        for index, count in other.positive.items():
+            self.positive[index] = self.positive.get(index, 0) + count
+        for index, count in other.negative.items():
+            self.negative[index] = self.negative.get(index, 0) + count
+
+    def _ordered_buckets(self) -> Iterable:
+        """Yield (representative value, count) from smallest to largest amount."""
+        for index in sorted(self.negative, reverse=True):
+            yield -self._value(index), self.negative[index]
+        if self.zero_count:
+            yield 0.0, self.zero_count
+        for index in sorted(self.positive):
+            yield self._value(index), self.positive[index]
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for value, count in self._ordered_buckets():
+            seen += count
+            if seen > rank:
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def bins(self, ratio: float = 2.0) -> List[Dict[str, float]]:
+        """Coarsen buckets into display bins with edges at powers of ``ratio``.
+
+        Negative amounts and zeros are folded into a single ``(min, 0]`` bin.
+        """
+        result: List[Dict[str, float]] = []
+        non_positive = self.zero_count + sum(self.negative.values())
+        if non_positive:
+            result.append({"lower": self.min, "upper": 0.0, "count": non_positive})
+        coarse: Dict[int, int] = {}
+        log_ratio = math.log(ratio)
+        for index, count in self.positive.items():
+            coarse_index = math.ceil(math.log(self._value(index)) / log_ratio)
+            coarse[coarse_index] = coarse.get(coarse_index, 0) + count
+        for coarse_index in sorted(coarse):
+            result.append(
+                {
+                    "lower": ratio ** (coarse_index - 1),
+                    "upper": ratio ** coarse_index,
+                    "count": coarse[coarse_index],
+                }
+            )
+        return result
+
+    def to_bytes(self) -> bytes:
+        parts = [
+            _HEADER.pack(
+                self.count,
+                self.total,
+                self.min if self.min is not None else 0.0,
+                self.max if self.max is not None else 0.0,
+                len(self.positive),
+                len(self.negative),
+                self.zero_count,
+            )
+        ]
+        for store in (self.positive, self.negative):
+            parts.extend(_ENTRY.pack(index, count) for index, count in sorted(store.items()))
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "LogHistogram":
+        sketch = cls()
+        count, total, min_value, max_value, n_positive, n_negative, zero_count = _HEADER.unpack_from(data)
+        sketch.count = count
+        sketch.total = total
+        sketch.zero_count = zero_count
+        if count:
+            sketch.min = min_value
+            sketch.max = max_value
+        offset = _HEADER.size
+        for store, size in ((sketch.positive, n_positive), (sketch.negative, n_negative)):
+            for _ in range(size):
+                index, bucket_count = _ENTRY.unpack_from(data, offset)
+                store[index] = bucket_count
+                offset += _ENTRY.size
+        return sketch
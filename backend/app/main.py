@@ -1,11 +1,21 @@
+import asyncio
+import logging
 from datetime import datetime
 
+import pymysql
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 
+from .core.admission import admission
 from .core.config import settings
 from .auth import router as auth_router
 from .expenses import router as expenses_router
+from .expenses.dimensions import type_dimension
+from .expenses.distribution import RefreshInProgress, refresh_sketches
+from .expenses.service import query_coalescer
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -23,12 +33,42 @@ app.add_middleware(
 )
 
 
+@app.on_event("startup")
+def load_type_dimension():
+    try:
+        type_dimension.ensure_fresh()
+    except pymysql.MySQLError:
+        # Keep the API bootable without the database; the cache loads on first query.
+        pass
+
+
+async def refresh_distribution_periodically():
+    while True:
+        try:
+            await run_in_threadpool(refresh_sketches)
+        except RefreshInProgress:
+            # Another worker or the CLI is refreshing; try again next interval.
+            pass
+        except Exception:
+            # Keep the loop alive on any failure (e.g. dirty rows); retry next interval.
+            logger.exception("Distribution sketch refresh failed")
+        await asyncio.sleep(settings.DISTRIBUTION_REFRESH_SECONDS)
+
+
+@app.on_event("startup")
+async def start_distribution_refresh():
+    if settings.DISTRIBUTION_REFRESH_SECONDS > 0:
+        app.state.distribution_refresh = asyncio.create_task(refresh_distribution_periodically())
+
+
 def get_health_payload():
     return {
         "status": "ok",
         "service": "openclaw-expenses-api",
         "version": app.version,
         "timestamp": datetime.utcnow().isoformat() + "Z",
+        "query_coalescing": query_coalescer.stats(),
+        "admission": admission.stats(),
     }
 
 
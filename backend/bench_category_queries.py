@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Compare the JOIN-based category query with the dimension-cache path.
+
+Run from backend/ against a database holding a realistic fact table
+(the dimension cache was sized for 5M+ rows in personal_expenses_final):
+
+    APP_ENV=development python bench_category_queries.py --repeat 5
+
+Without such data, ``--seed N`` fills the scratch table
+personal_expenses_final_bench (same definition as personal_expenses_final)
+with N synthetic rows over the existing type codes and benchmarks that:
+
+    APP_ENV=development python bench_category_queries.py --seed 5000000
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.core.database import get_db_connection
+from app.expenses.dimensions import type_dimension
+from app.expenses.service import _aggregate_by_type_name
+
+JOIN_SQL = """
+SELECT
+    pet.trans_type_name,
+    pet.trans_sub_type_name,
+    COUNT(pef.id) AS count,
+    SUM(pef.trans_amount) AS total_amount
+FROM {table} AS pef
+JOIN personal_expenses_type AS pet
+    ON pef.trans_code = pet.trans_code AND pef.trans_sub_code = pet.trans_sub_code
+WHERE pef.deleted_at = 0
+GROUP BY pet.trans_type_name, pet.trans_sub_type_name
+"""
+
+CODES_SQL = """
+SELECT
+    trans_code,
+    trans_sub_code,
+    COUNT(id) AS count,
+    SUM(trans_amount) AS total_amount
+FROM {table}
+WHERE deleted_at = 0
+GROUP BY trans_code, trans_sub_code
+"""
+
+
+FACT_TABLE = "personal_expenses_final"
+BENCH_TABLE = "personal_expenses_final_bench"
+SEED_BATCH_SIZE = 10000
+SEED_USERS = 20
+
+
+def seed(conn, rows):
+    """Recreate BENCH_TABLE with ``rows`` synthetic expenses; returns the row count."""
+    rng = random.Random(0)
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT trans_code, trans_sub_code FROM personal_expenses_type")
+        codes = [(row["trans_code"], row["trans_sub_code"]) for row in cursor.fetchall()]
+        # A few codes without a type row, as in real data; the JOIN drops them.
+        codes += [("bench-unknown", str(position)) for position in range(max(1, len(codes) // 20))]
+        cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+        cursor.execute(f"CREATE TABLE {BENCH_TABLE} LIKE {FACT_TABLE}")
+        conn.commit()
+
+        start = datetime(2020, 1, 1)
+        span = int((datetime(2026, 1, 1) - start).total_seconds())
+        for offset in range(0, rows, SEED_BATCH_SIZE):
+            batch = []
+            for row_id in range(offset + 1, min(offset + SEED_BATCH_SIZE, rows) + 1):
+                moment = start + timedelta(seconds=rng.randrange(span))
+                code, sub_code = rng.choice(codes)
+                batch.append((
+                    row_id,
+                    str(rng.randrange(SEED_USERS)),
+                    moment.year,
+                    moment.month,
+                    moment.date(),
+                    moment,
+                    code,
+                    sub_code,
+                    round(rng.lognormvariate(3, 1.5), 2),
+                    f"account-{rng.randrange(8)}",
+                    0 if rng.random() > 0.02 else 1,
+                ))
+            cursor.executemany(
+                f"""
+                INSERT INTO {BENCH_TABLE}
+                    (id, user_id, trans_year, trans_month, trans_date, trans_datetime,
+                     trans_code, trans_sub_code, trans_amount, pay_account, deleted_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """,
+                batch,
+            )
+            conn.commit()
+            print(f"Seeded {offset + len(batch)}/{rows} rows", end="\r", flush=True)
+        print()
+    return rows
+
+
+def timed(cursor, sql, post=None):
+    start = time.perf_counter()
+    cursor.execute(sql)
+    rows = cursor.fetchall()
+    if post:
+        rows = post(rows)
+    return time.perf_counter() - start, len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--seed",
+        type=int,
+        metavar="N",
+        help=f"benchmark {BENCH_TABLE}, refilled with N synthetic rows",
+    )
+    args = parser.parse_args()
+
+    type_dimension.ensure_fresh()
+    conn = get_db_connection()
+    try:
+        table = FACT_TABLE
+        if args.seed:
+            table = BENCH_TABLE
+            seed(conn, args.seed)
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) AS n FROM {table} WHERE deleted_at = 0")
+            print(f"Fact rows in {table}: {cursor.fetchone()['n']}")
+            for label, sql, post in (
+                ("join", JOIN_SQL, None),
+                ("dimension cache", CODES_SQL, _aggregate_by_type_name),
+            ):
+                runs = [timed(cursor, sql.format(table=table), post) for _ in range(args.repeat)]
+                best = min(elapsed for elapsed, _ in runs)
+                print(f"{label:>16}: best {best * 1000:.1f} ms over {args.repeat} runs, {runs[0][1]} groups")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
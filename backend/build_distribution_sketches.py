@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""Build or refresh the per (user, month, category) amount distribution sketches.
+
+    APP_ENV=production python build_distribution_sketches.py            # new rows + recent months
+    APP_ENV=production python build_distribution_sketches.py --rebuild  # e.g. nightly, for older deletes/edits
+"""
+
+import argparse
+import sys
+
+from app.expenses.distribution import RefreshInProgress, refresh_sketches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="drop all sketches and rebuild them from personal_expenses_final",
+    )
+    args = parser.parse_args()
+
+    try:
+        added = refresh_sketches(rebuild=args.rebuild)
+    except RefreshInProgress as exc:
+        print(exc)
+        sys.exit(1)
+    print(f"Sketched {added} expense rows")
+
+
+if __name__ == "__main__":
+    main()
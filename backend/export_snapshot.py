@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""Export personal_expenses_final to partitioned Parquet / Arrow IPC snapshots.
+
+Each run appends only rows whose id is above the previous snapshot's; rows deleted
+or edited later, or committed out of id order, are not reflected until --full:
+
+    APP_ENV=production python export_snapshot.py --output /data/expenses-snapshot
+    APP_ENV=production python export_snapshot.py --format arrow --output /data/expenses-arrow
+    APP_ENV=production python export_snapshot.py --full --output /data/expenses-snapshot
+"""
+
+import argparse
+
+from app.core.config import settings
+from app.expenses.export import FORMATS, export_snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default=settings.EXPORT_DIR, help="snapshot directory")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="parquet")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="re-export every row and replace the snapshot directory",
+    )
+    args = parser.parse_args()
+
+    result = export_snapshot(args.output, args.format, full=args.full)
+    print(
+        f"Snapshot {result['snapshot_id']}: {result['rows']} rows into {result['files']} files "
+        f"in {result['seconds']}s ({result['rows_per_second']} rows/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.admission import Bulkhead, Saturated
+from app.expenses import router, service
+
+
+async def _hold(bulkhead, release):
+    async with bulkhead.slot():
+        await release.wait()
+
+
+def test_admits_queues_rejects_and_times_out():
+    async def scenario():
+        bulkhead = Bulkhead("test", max_concurrent=1, max_queue=1, queue_timeout=0.2)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(bulkhead, release))
+        await asyncio.sleep(0)
+        assert bulkhead.stats()["active"] == 1
+
+        queued = asyncio.create_task(_hold(bulkhead, release))
+        await asyncio.sleep(0)
+        assert bulkhead.stats()["waiting"] == 1
+
+        with pytest.raises(Saturated) as rejected:
+            async with bulkhead.slot():
+                pass
+        with pytest.raises(Saturated) as timed_out:
+            await queued
+        release.set()
+        await holder
+        return bulkhead, rejected.value, timed_out.value
+
+    bulkhead, rejected, timed_out = asyncio.run(scenario())
+
+    assert rejected.retry_after == 1
+    assert timed_out.retry_after == 1
+    assert bulkhead.stats() == {
+        "admitted": 1,
+        "queued": 1,
+        "rejected": 1,
+        "queue_timeouts": 1,
+        "active": 0,
+        "waiting": 0,
+    }
+
+
+def test_queued_caller_is_admitted_when_a_slot_frees():
+    async def scenario():
+        bulkhead = Bulkhead("test", max_concurrent=1, max_queue=1, queue_timeout=1)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(bulkhead, release))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(_hold(bulkhead, asyncio.Event()))
+        await asyncio.sleep(0)
+        release.set()
+        await holder
+        for _ in range(100):
+            if bulkhead.stats()["active"]:
+                break
+            await asyncio.sleep(0.01)
+        stats = bulkhead.stats()
+        queued.cancel()
+        return stats
+
+    stats = asyncio.run(scenario())
+
+    assert stats["admitted"] == 2
+    assert stats["queued"] == 1
+    assert stats["active"] == 1
+    assert stats["waiting"] == 0
+
+
+def test_retry_after_rounds_queue_timeout_up():
+    assert Bulkhead("test", 1, 0, queue_timeout=2.5)._saturated().retry_after == 3
+    assert Bulkhead("test", 1, 0, queue_timeout=0)._saturated().retry_after == 1
+
+
+def test_saturation_maps_to_503_with_retry_after(monkeypatch):
+    async def saturated(*args):
+        raise Saturated("summary", 5)
+
+    monkeypatch.setattr(service, "run_coalesced", saturated)
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(router._run_query(service.get_summary, {"id": 1, "username": "u"}))
+
+    assert raised.value.status_code == 503
+    assert raised.value.headers == {"Retry-After": "5"}
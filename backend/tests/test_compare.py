@@ -0,0 +1,41 @@
+import re
+from datetime import date
+
+import pytest
+
+from app.expenses.router import MONTH_PATTERN
+from app.expenses.service import _comparison_bounds, _month_start
+
+
+def test_month_start_rolls_over_year_boundaries():
+    assert _month_start(2026, 0) == date(2025, 12, 1)
+    assert _month_start(2026, 13) == date(2027, 1, 1)
+    assert _month_start(2026, 5) == date(2026, 5, 1)
+
+
+def test_january_compares_with_previous_december():
+    current_start, current_end, previous_start, year_ago_start, year_ago_end = _comparison_bounds(2026, 1)
+
+    assert (current_start, current_end) == (date(2026, 1, 1), date(2026, 2, 1))
+    assert previous_start == date(2025, 12, 1)
+    assert (year_ago_start, year_ago_end) == (date(2025, 1, 1), date(2025, 2, 1))
+
+
+def test_december_end_rolls_into_next_year():
+    current_start, current_end, previous_start, year_ago_start, year_ago_end = _comparison_bounds(2026, 12)
+
+    assert (current_start, current_end) == (date(2026, 12, 1), date(2027, 1, 1))
+    assert previous_start == date(2026, 11, 1)
+    assert (year_ago_start, year_ago_end) == (date(2025, 12, 1), date(2026, 1, 1))
+
+
+@pytest.mark.parametrize("period", ["0000-01", "0001-01", "1899-12", "2100-01", "9999-12", "2026-13", "2026-00"])
+def test_month_pattern_rejects_out_of_range_periods(period):
+    assert re.fullmatch(MONTH_PATTERN, period) is None
+
+
+@pytest.mark.parametrize("period", ["1900-01", "2026-01", "2099-12"])
+def test_month_pattern_accepts_supported_periods(period):
+    year, month = map(int, period.split("-"))
+    assert re.fullmatch(MONTH_PATTERN, period)
+    _comparison_bounds(year, month)
@@ -0,0 +1,23 @@
+import pymysql
+from pymysql.constants import CR, ER
+
+from app.core.database import query_timeout_kind
+
+
+def test_server_statement_limits_are_statement_timeouts():
+    assert query_timeout_kind(pymysql.err.OperationalError(ER.QUERY_TIMEOUT, "interrupted")) == "statement"
+    assert query_timeout_kind(pymysql.err.OperationalError(ER.STATEMENT_TIMEOUT, "interrupted")) == "statement"
+
+
+def test_only_read_timeout_disconnects_count_as_timeouts():
+    timed_out = pymysql.err.OperationalError(
+        CR.CR_SERVER_LOST, "Lost connection to MySQL server during query (timed out)"
+    )
+    reset = pymysql.err.OperationalError(
+        CR.CR_SERVER_LOST, "Lost connection to MySQL server during query ([Errno 104] Connection reset by peer)"
+    )
+
+    assert query_timeout_kind(timed_out) == "read"
+    assert query_timeout_kind(reset) is None
+    assert query_timeout_kind(pymysql.err.OperationalError(ER.LOCK_WAIT_TIMEOUT, "lock")) is None
+    assert query_timeout_kind(ValueError("timed out")) is None
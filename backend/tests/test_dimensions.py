@@ -0,0 +1,32 @@
+from app.expenses.dimensions import TypeDimension, _normalize_code
+
+
+def _loaded_dimension(names):
+    dimension = TypeDimension(check_interval=3600)
+    dimension._names = {
+        (_normalize_code(code), _normalize_code(sub_code)): pair for (code, sub_code), pair in names.items()
+    }
+    return dimension
+
+
+def test_lookup_matches_mysql_comparison_rules():
+    dimension = _loaded_dimension({("FOOD", "01"): ("餐饮", "午餐"), (7, 2): ("交通", "地铁")})
+
+    assert dimension.lookup("food", "01") == ("餐饮", "午餐")
+    assert dimension.lookup("Food  ", "01 ") == ("餐饮", "午餐")
+    assert dimension.lookup("7", 2) == ("交通", "地铁")
+    assert dimension.lookup(7, "2") == ("交通", "地铁")
+
+
+def test_lookup_keeps_leading_zeros_and_misses_unknown_codes():
+    dimension = _loaded_dimension({("FOOD", "01"): ("餐饮", "午餐")})
+
+    assert dimension.lookup("FOOD", 1) is None
+    assert dimension.lookup("FOOD", None) is None
+    assert dimension.lookup("OTHER", "01") is None
+
+
+def test_all_names_is_sorted_and_skips_nulls():
+    dimension = _loaded_dimension({("a", "1"): ("B", None), ("a", "2"): ("B", "A")})
+
+    assert dimension.all_names() == ["A", "B"]
@@ -0,0 +1,77 @@
+from datetime import datetime
+
+from app.expenses import distribution
+
+
+class _FakeCursor:
+    """Answers the fold and rescan SELECTs from an in-memory fact table."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self._result = []
+
+    def execute(self, sql, params):
+        live = [row for row in self.rows if row["deleted_at"] == 0]
+        if "LIMIT" in sql:
+            start_id, end_id, limit = params
+            self._result = [row for row in live if start_id < row["id"] <= end_id][:limit]
+        else:
+            end_id, window_period = params
+            self._result = [
+                row
+                for row in live
+                if row["id"] <= end_id
+                and row["trans_year"] is not None
+                and row["trans_month"] is not None
+                and int(row["trans_year"]) * 100 + int(row["trans_month"]) >= window_period
+            ]
+
+    def fetchall(self):
+        return self._result
+
+
+def _row(row_id, year, month, amount, trans_datetime, code="A", sub_code="1"):
+    return {
+        "id": row_id,
+        "user_id": 7,
+        "trans_year": year,
+        "trans_month": month,
+        "trans_datetime": trans_datetime,
+        "trans_code": code,
+        "trans_sub_code": sub_code,
+        "trans_amount": amount,
+        "deleted_at": 0,
+    }
+
+
+def test_rows_split_between_fold_and_rescan_by_period_key():
+    rows = [
+        _row(1, 2026, 7, 10.0, datetime(2026, 7, 31)),
+        # Booked into the window month, but its timestamp is just before it.
+        _row(2, 2026, 8, 20.0, datetime(2026, 7, 31, 23, 59)),
+        _row(3, 2026, 9, 30.0, datetime(2026, 9, 2)),
+    ]
+    cursor = _FakeCursor(rows)
+
+    folded_sketches = {}
+    folded = distribution._fold_new_rows(cursor, 0, 3, 202608, folded_sketches)
+    window = distribution._rescan_window(cursor, 3, 202608)
+
+    assert folded == 1
+    assert list(folded_sketches) == [("7", 2026, 7, "A", "1")]
+    assert set(window) == {("7", 2026, 8, "A", "1"), ("7", 2026, 9, "A", "1")}
+    assert sum(sketch.count for sketch in window.values()) == 2
+
+
+def test_null_periods_are_skipped_and_null_codes_stored_empty():
+    rows = [
+        _row(1, None, 7, 10.0, None),
+        _row(2, 2026, None, 10.0, None),
+        _row(3, 2026, 7, 10.0, None, code=None, sub_code=None),
+    ]
+    sketches = {}
+
+    folded = distribution._fold_new_rows(_FakeCursor(rows), 0, 3, 202608, sketches)
+
+    assert folded == 1
+    assert list(sketches) == [("7", 2026, 7, "", "")]
@@ -0,0 +1,91 @@
+from decimal import Decimal
+
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import pytest
+from pymysql.constants import FIELD_TYPE
+
+from app.expenses import export
+from app.expenses.dimensions import _normalize_code, type_dimension
+
+DESCRIPTION = [
+    ("id", FIELD_TYPE.LONGLONG, None, 20, 20, 0, False),
+    ("user_id", FIELD_TYPE.VAR_STRING, None, 50, 50, 0, False),
+    ("trans_year", FIELD_TYPE.VAR_STRING, None, 4, 4, 0, False),
+    ("trans_month", FIELD_TYPE.VAR_STRING, None, 2, 2, 0, False),
+    ("trans_date", FIELD_TYPE.DATE, None, 10, 10, 0, True),
+    ("trans_datetime", FIELD_TYPE.DATETIME, None, 19, 19, 0, True),
+    ("trans_code", FIELD_TYPE.VAR_STRING, None, 8, 8, 0, True),
+    ("trans_sub_code", FIELD_TYPE.VAR_STRING, None, 8, 8, 0, True),
+    ("trans_amount", FIELD_TYPE.NEWDECIMAL, None, 12, 12, 2, True),
+    ("pay_account", FIELD_TYPE.VAR_STRING, None, 50, 50, 0, True),
+]
+
+
+class _FakeCursor:
+    def __init__(self, rows):
+        self._rows = rows
+        self.description = DESCRIPTION
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params):
+        self._pending = [row for row in self._rows if row[0] > params[0]]
+
+    def fetchmany(self, size):
+        batch, self._pending = self._pending[:size], self._pending[size:]
+        return batch
+
+
+class _FakeConnection:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def cursor(self):
+        return _FakeCursor(self._rows)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fact_rows(monkeypatch):
+    rows = [
+        (1, "admin-system-id", "2024", "12", None, None, "F", "1", Decimal("12.50"), "card"),
+        (2, "1001", "2025", "01", None, None, "F", "2", Decimal("3.00"), "cash"),
+        (3, "1001", "2025", "02", None, None, "X", "9", None, None),
+    ]
+    monkeypatch.setattr(export, "get_db_connection", lambda **options: _FakeConnection(rows))
+    monkeypatch.setattr(type_dimension, "ensure_fresh", lambda: None)
+    monkeypatch.setattr(
+        type_dimension,
+        "_names",
+        {(_normalize_code("F"), "1"): ("餐饮", "午餐"), (_normalize_code("F"), "2"): ("餐饮", "晚餐")},
+    )
+    return rows
+
+
+def test_parquet_snapshot_reads_back_with_read_table(tmp_path, fact_rows):
+    result = export.export_snapshot(str(tmp_path / "snapshot"))
+
+    table = pq.read_table(str(tmp_path / "snapshot")).sort_by("id")
+    assert result["rows"] == 3
+    assert table.num_rows == 3
+    assert [str(value) for value in table.column("user_id").to_pylist()] == ["admin-system-id", "1001", "1001"]
+    assert table.column("trans_type_name").to_pylist() == ["餐饮", "餐饮", None]
+    assert table.column("trans_amount").to_pylist() == [Decimal("12.50"), Decimal("3.00"), None]
+
+
+def test_incremental_run_appends_only_new_rows(tmp_path, fact_rows):
+    export.export_snapshot(str(tmp_path / "snapshot"), "arrow")
+    fact_rows.append((4, "1001", "2025", "02", None, None, "F", "1", Decimal("1.00"), "card"))
+
+    second = export.export_snapshot(str(tmp_path / "snapshot"), "arrow")
+
+    table = ds.dataset(str(tmp_path / "snapshot"), format="ipc", partitioning="hive").to_table()
+    assert second["rows"] == 1
+    assert sorted(table.column("id").to_pylist()) == [1, 2, 3, 4]
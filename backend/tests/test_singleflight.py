@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from app.core.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_execution():
+    async def scenario():
+        flight = SingleFlight()
+        calls = []
+
+        async def query(value):
+            calls.append(value)
+            await asyncio.sleep(0.05)
+            return {"value": value}
+
+        results = await asyncio.gather(*(flight.run("key", query, 1) for _ in range(5)))
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(scenario())
+
+    assert calls == [1]
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {"executed": 1, "coalesced": 4, "errors": 0, "timeouts": 0, "inflight": 0}
+
+
+def test_error_reaches_every_waiter():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.05)
+            raise RuntimeError("boom")
+
+        results = await asyncio.gather(*(flight.run("key", failing) for _ in range(3)), return_exceptions=True)
+        return flight, results
+
+    flight, results = asyncio.run(scenario())
+
+    assert [type(result) for result in results] == [RuntimeError] * 3
+    assert flight.stats()["errors"] == 1
+    assert flight.stats()["inflight"] == 0
+
+
+def test_waiter_timeout_does_not_cancel_shared_call():
+    async def scenario():
+        flight = SingleFlight(timeout=0.05)
+        finished = []
+
+        async def slow():
+            await asyncio.sleep(0.2)
+            finished.append(True)
+            return "done"
+
+        with pytest.raises(asyncio.TimeoutError):
+            await flight.run("key", slow)
+        assert flight.stats()["inflight"] == 1
+
+        # A later caller joins the still-running call instead of starting another.
+        flight.timeout = 1
+        result = await flight.run("key", slow)
+        return flight, finished, result
+
+    flight, finished, result = asyncio.run(scenario())
+
+    assert result == "done"
+    assert finished == [True]
+    assert flight.stats() == {"executed": 1, "coalesced": 1, "errors": 0, "timeouts": 1, "inflight": 0}
+
+
+def test_finished_call_is_not_cached():
+    async def scenario():
+        flight = SingleFlight()
+        calls = []
+
+        async def query():
+            calls.append(True)
+            return len(calls)
+
+        first = await flight.run("key", query)
+        second = await flight.run("key", query)
+        other = await flight.run("other", query)
+        return flight, first, second, other
+
+    flight, first, second, other = asyncio.run(scenario())
+
+    assert (first, second, other) == (1, 2, 3)
+    assert flight.stats()["executed"] == 3
+    assert flight.stats()["inflight"] == 0
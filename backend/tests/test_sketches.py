@@ -0,0 +1,76 @@
+import random
+
+import pytest
+
+from app.expenses.sketches import RELATIVE_ACCURACY, LogHistogram
+
+
+def _exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def _merged_round_trip(values, parts=7):
+    sketches = [LogHistogram() for _ in range(parts)]
+    for position, value in enumerate(values):
+        sketches[position % parts].add(value)
+    merged = LogHistogram()
+    for sketch in sketches:
+        merged.merge(LogHistogram.from_bytes(sketch.to_bytes()))
+    return merged
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_merged_quantiles_within_relative_accuracy(seed):
+    rng = random.Random(seed)
+    values = [round(rng.lognormvariate(3, 1.5), 2) for _ in range(20000)]
+
+    merged = _merged_round_trip(values)
+
+    for q in (0.5, 0.9, 0.99):
+        exact = _exact_quantile(values, q)
+        assert merged.quantile(q) == pytest.approx(exact, rel=RELATIVE_ACCURACY)
+
+
+def test_exact_aggregates_survive_merge_and_serialisation():
+    rng = random.Random(4)
+    values = [round(rng.uniform(0.01, 5000), 2) for _ in range(5000)]
+
+    merged = _merged_round_trip(values)
+
+    assert merged.count == len(values)
+    assert merged.total == pytest.approx(sum(values))
+    assert merged.min == min(values)
+    assert merged.max == max(values)
+    assert sum(item["count"] for item in merged.bins()) == len(values)
+
+
+def test_zeros_and_negatives():
+    rng = random.Random(5)
+    refunds = [-round(rng.uniform(1, 100), 2) for _ in range(300)]
+    values = refunds + [0.0] * 200 + [round(rng.uniform(1, 100), 2) for _ in range(500)]
+
+    merged = _merged_round_trip(values)
+
+    assert merged.min == min(values)
+    assert merged.quantile(0.4) == 0.0
+    for q in (0.1, 0.2, 0.9):
+        exact = _exact_quantile(values, q)
+        assert merged.quantile(q) == pytest.approx(exact, rel=RELATIVE_ACCURACY)
+    bins = merged.bins()
+    assert bins[0] == {"lower": min(values), "upper": 0.0, "count": 500}
+
+
+def test_empty_sketch():
+    empty = LogHistogram.from_bytes(LogHistogram().to_bytes())
+
+    assert empty.count == 0
+    assert empty.min is None and empty.max is None
+    assert empty.quantile(0.5) is None
+    assert empty.bins() == []
+
+    filled = LogHistogram()
+    filled.add(12.5)
+    filled.merge(empty)
+    assert filled.count == 1
+    assert filled.quantile(0.99) == 12.5